@@ -1,48 +1,62 @@
+import math
+
 import streamlit as st
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+
+from loan_kernels import amort_core
 
 # ----------------------------
 # Loan Amortization Functions
 # ----------------------------
 
+@st.cache_data(max_entries=128)
 def amortization_schedule(P, r_annual, years, extra_annual=0):
     r = r_annual / 12 / 100          # monthly interest rate
     n = int(years * 12)              # number of payments
-    EMI = P * r * (1 + r)**n / ((1 + r)**n - 1)
-
-    balance = P
-    schedule = []
 
-    for month in range(1, n + 1):
-        interest = balance * r
+    if extra_annual > 0:
+        months, principal, interest, balance = amort_core(float(P), r, n, float(extra_annual))
+    else:
+        # One power table (1+r)**m for m = 0..n serves both the EMI and the closed-form balance;
+        # its first entry gives the opening balance P, so interest needs no concatenate
+        pow_r_all = np.power(1 + r, np.arange(0, n + 1, dtype=np.float64))
+        EMI = P * r * pow_r_all[n] / (pow_r_all[n] - 1)
+        balance_all = P * pow_r_all - EMI * (pow_r_all - 1) / r
+        months = np.arange(1, n + 1)
+        interest = balance_all[:-1] * r
         principal = EMI - interest
+        balance = balance_all[1:]
 
-        # Apply extra payment once per year (at year-end)
-        if extra_annual > 0 and month % 12 == 0:
-            principal += extra_annual
-
-        balance -= principal
+    # Loan fully paid (early, with extra payments): the balance only ever falls,
+    # so the payoff month is a binary search rather than a check every month
+    total_months = min(int(np.searchsorted(-balance, 0, side="left")) + 1, n)
+    months = months[:total_months]
+    balance = balance[:total_months]
+    interest = interest[:total_months]
+    principal = principal[:total_months]
+    if balance[-1] < 0:
+        principal[-1] += balance[-1]
+        balance[-1] = 0
 
-        if balance < 0:  # Loan fully paid early
-            principal += balance
-            balance = 0
+    return months, principal, interest, balance, total_months
 
-        schedule.append([month, principal, interest, balance])
 
-        if balance <= 0:
-            break
+def _downsample(x, *ys, max_points=200):
+    # Stride-downsample series for plotting, always keeping the final point.
+    # float32 is ample at chart resolution and halves the payload sent to the browser.
+    stride = max(1, -(-len(x) // max_points))
+    idx = np.r_[np.arange(0, len(x) - 1, stride), len(x) - 1]
+    return (x[idx],) + tuple(y[idx].astype(np.float32) for y in ys)
 
-    df = pd.DataFrame(schedule, columns=["Month", "Principal", "Interest", "Balance"])
-    total_interest = df["Interest"].sum()
-    total_months = int(df["Month"].iloc[-1])
 
-    return df, total_interest, total_months
+def _fmt_rupee(x):
+    # Thousands-separated whole-rupee string
+    return f"₹{x:,.0f}"
 
 # ----------------------------
 # Investment FV (annual contributions, compounded annually)
 # ----------------------------
+@st.cache_data(max_entries=128)
 def future_value_annuity(annual_contrib, annual_return_pct, years):
     # ordinary annuity: contributions at end of each period
     r = annual_return_pct / 100.0
@@ -52,7 +66,7 @@ def future_value_annuity(annual_contrib, annual_return_pct, years):
     if abs(r) < 1e-12:
         # no growth
         return annual_contrib * n
-    fv = annual_contrib * ((1 + r)**n - 1) / r
+    fv = annual_contrib * (math.pow(1 + r, n) - 1) / r
     return fv
 
 # ----------------------------
@@ -61,22 +75,41 @@ def future_value_annuity(annual_contrib, annual_return_pct, years):
 st.title("🏠 Home Loan Impact — Pay Extra vs Invest")
 st.write("Compare the effect of making extra annual principal payments vs investing that same annual amount in a portfolio with a given annual return.")
 
-st.sidebar.header("Loan Inputs")
+# Inputs live in a form so dragging a slider doesn't rerun everything; changes apply on "Recompute"
+with st.sidebar.form("inputs"):
+    st.header("Loan Inputs")
 
-# Sliders + manual input
-P = st.sidebar.number_input("Principal Amount (₹)", min_value=100_000, max_value=100_000_000, value=5_000_000, step=50_000, format="%d")
-r = st.sidebar.slider("Annual Interest Rate (%)", min_value=1.0, max_value=20.0, value=8.0, step=0.1)
-years = st.sidebar.slider("Tenure (Years)", min_value=1, max_value=40, value=20)
-extra = st.sidebar.number_input("Extra Annual Payment (₹)", min_value=0, max_value=5_000_000, value=50_000, step=10_000, format="%d")
+    # Sliders + manual input
+    P = st.number_input("Principal Amount (₹)", min_value=100_000, max_value=100_000_000, value=5_000_000, step=50_000, format="%d")
+    r = st.slider("Annual Interest Rate (%)", min_value=1.0, max_value=20.0, value=8.0, step=0.1)
+    years = st.slider("Tenure (Years)", min_value=1, max_value=40, value=20)
+    extra = st.number_input("Extra Annual Payment (₹)", min_value=0, max_value=5_000_000, value=50_000, step=10_000, format="%d")
 
-st.sidebar.header("Investment Comparison")
-annual_return = st.sidebar.slider("Annual Portfolio Return (%)", min_value=0.0, max_value=30.0, value=7.0, step=0.1)
+    st.header("Investment Comparison")
+    annual_return = st.slider("Annual Portfolio Return (%)", min_value=0.0, max_value=30.0, value=7.0, step=0.1)
+
+    st.form_submit_button("Recompute")
 
 # ----------------------------
 # Compute amortization
 # ----------------------------
-df_base, interest_base, months_base = amortization_schedule(P, r, years, extra_annual=0)
-df_extra, interest_extra, months_extra = amortization_schedule(P, r, years, extra_annual=extra)
+# With no extra payment both schedules are identical, so compute (and plot) only one
+skip_extra = extra == 0
+
+months_b, prin_b, int_b, bal_b, months_base = amortization_schedule(P, r, years, 0)
+if skip_extra:
+    months_e, prin_e, int_e, bal_e, months_extra = months_b, prin_b, int_b, bal_b, months_base
+else:
+    months_e, prin_e, int_e, bal_e, months_extra = amortization_schedule(P, r, years, extra)
+
+# Cumulative sums are taken once and shared by the totals and the chart
+cum_int_base, cum_prin_base = np.cumsum(int_b), np.cumsum(prin_b)
+if skip_extra:
+    cum_int_extra, cum_prin_extra = cum_int_base, cum_prin_base
+else:
+    cum_int_extra, cum_prin_extra = np.cumsum(int_e), np.cumsum(prin_e)
+interest_base = cum_int_base[-1]
+interest_extra = cum_int_extra[-1]
 
 # ----------------------------
 # Comparison Metrics
@@ -94,9 +127,9 @@ returns_earned = fv_invest - total_invested  # profit earned
 st.subheader("📊 Results Summary")
 
 col1, col2, col3 = st.columns(3)
-col1.metric("Interest (Normal)", f"₹{interest_base:,.0f}")
-col2.metric("Interest (With Extra)", f"₹{interest_extra:,.0f}")
-col3.metric("Interest Saved", f"₹{interest_saved:,.0f}")
+col1.metric("Interest (Normal)", _fmt_rupee(interest_base))
+col2.metric("Interest (With Extra)", _fmt_rupee(interest_extra))
+col3.metric("Interest Saved", _fmt_rupee(interest_saved))
 
 col4, col5, col6 = st.columns(3)
 col4.metric("Tenure (Normal)", f"{months_base/12:.1f} years")
@@ -106,40 +139,45 @@ col6.metric("Tenure Saved", f"{years_saved:.2f} years")
 st.markdown("---")
 st.subheader("💡 Investment vs Extra Payment (Default)")
 c1, c2 = st.columns(2)
-c1.metric("Annual Invest Amount", f"₹{extra:,.0f}")
+c1.metric("Annual Invest Amount", _fmt_rupee(extra))
 c1.metric("Investment Horizon (Original Loan)", f"{years_invest:.1f} years")
 c2.metric("Portfolio Annual Return", f"{annual_return:.2f}%")
-c2.metric("Future Value (Invest, original horizon)", f"₹{fv_invest:,.0f}")
+c2.metric("Future Value (Invest, original horizon)", _fmt_rupee(fv_invest))
 
-st.write(f"Total invested amount if invested annually for original loan tenure: ₹{total_invested:,.0f}")
-st.write(f"Returns earned (profit) from investing for original loan tenure: ₹{returns_earned:,.0f}")
+st.write(f"Total invested amount if invested annually for original loan tenure: {_fmt_rupee(total_invested)}")
+st.write(f"Returns earned (profit) from investing for original loan tenure: {_fmt_rupee(returns_earned)}")
 
 net_benefit = returns_earned - interest_saved
 if net_benefit > 0:
-    st.success(f"Net benefit (Investing for original tenure - Interest Saved): ₹{net_benefit:,.0f} → Investing (original horizon) yields more.")
+    st.success(f"Net benefit (Investing for original tenure - Interest Saved): {_fmt_rupee(net_benefit)} → Investing (original horizon) yields more.")
 elif net_benefit < 0:
-    st.error(f"Net benefit (Investing for original tenure - Interest Saved): ₹{net_benefit:,.0f} → Paying extra yields more interest-savings.")
+    st.error(f"Net benefit (Investing for original tenure - Interest Saved): {_fmt_rupee(net_benefit)} → Paying extra yields more interest-savings.")
 else:
-    st.info(f"Net benefit: ₹{net_benefit:,.0f} → Both options roughly equal.")
+    st.info(f"Net benefit: {_fmt_rupee(net_benefit)} → Both options roughly equal.")
 
 # ----------------------------
 # Graph 1: Interest vs Principal Breakdown
 # ----------------------------
 st.subheader("📈 Cumulative Interest & Principal over Time")
 
-fig1, ax1 = plt.subplots(figsize=(10, 5))
+import plotly.graph_objects as go  # deferred so the summary above renders before the import
+
+plot_m_b, plot_int_b, plot_prin_b = _downsample(months_b, cum_int_base, cum_prin_base)
+if not skip_extra:
+    plot_m_e, plot_int_e, plot_prin_e = _downsample(months_e, cum_int_extra, cum_prin_extra)
 
-ax1.plot(df_base["Month"], df_base["Interest"].cumsum(), label="Interest (Normal)", linewidth=2)
-ax1.plot(df_extra["Month"], df_extra["Interest"].cumsum(), label="Interest (With Extra)", linewidth=2)
-ax1.plot(df_base["Month"], df_base["Principal"].cumsum(), label="Principal (Normal)", linestyle="--")
-ax1.plot(df_extra["Month"], df_extra["Principal"].cumsum(), label="Principal (With Extra)", linestyle="--")
+fig1 = go.Figure()
 
-ax1.set_xlabel("Month")
-ax1.set_ylabel("Cumulative Amount (₹)")
-ax1.legend()
-ax1.grid(True)
+fig1.add_scatter(x=plot_m_b, y=plot_int_b, name="Interest (Normal)", line=dict(width=2))
+if not skip_extra:
+    fig1.add_scatter(x=plot_m_e, y=plot_int_e, name="Interest (With Extra)", line=dict(width=2))
+fig1.add_scatter(x=plot_m_b, y=plot_prin_b, name="Principal (Normal)", line=dict(dash="dash"))
+if not skip_extra:
+    fig1.add_scatter(x=plot_m_e, y=plot_prin_e, name="Principal (With Extra)", line=dict(dash="dash"))
 
-st.pyplot(fig1)
+fig1.update_layout(xaxis_title="Month", yaxis_title="Cumulative Amount (₹)", height=500)
+
+st.plotly_chart(fig1)
 
 # ----------------------------
 # Graph 2: Interest Saved vs Returns Earned (Investing Same Annual Amount)
@@ -149,23 +187,11 @@ st.subheader("📊 Interest Saved vs Returns Earned (Investing Same Annual Amoun
 labels = ["Interest Saved (₹)", "Returns Earned (₹)"]
 values = [interest_saved, returns_earned]
 
-fig2, ax2 = plt.subplots(figsize=(8, 4))
-bars = ax2.bar(labels, values)
-ax2.set_ylabel("Amount (₹)")
-ax2.set_title("Interest Saved vs Returns Earned (original horizon)")
-ax2.grid(axis="y", linestyle="--", alpha=0.4)
-
 # Annotate bars with values
-for bar in bars:
-    height = bar.get_height()
-    ax2.annotate(f"₹{height:,.0f}",
-                 xy=(bar.get_x() + bar.get_width() / 2, height),
-                 xytext=(0, 6),
-                 textcoords="offset points",
-                 ha='center', va='bottom')
-
-ax2.axhline(0, color='black', linewidth=0.8)
-st.pyplot(fig2)
+fig2 = go.Figure(go.Bar(x=labels, y=values, texttemplate="₹%{y:,.0f}", textposition="outside"))
+fig2.update_layout(title="Interest Saved vs Returns Earned (original horizon)", yaxis_title="Amount (₹)", height=400)
+fig2.update_yaxes(zeroline=True, zerolinecolor="black", zerolinewidth=0.8)
+st.plotly_chart(fig2)
 
 # ----------------------------
 # Optional comparison for shortened loan period (button)
@@ -181,42 +207,43 @@ if st.button("Compare investing for shortened loan period (optional)"):
     returns_earned_short = fv_invest_short - total_invested_short
 
     st.write(f"Shortened loan period (with extra payments): {years_short:.2f} years ({months_extra} months).")
-    st.write(f"Future Value if invested annually for shortened period: ₹{fv_invest_short:,.0f}")
-    st.write(f"Total invested (shortened period): ₹{total_invested_short:,.0f}")
-    st.write(f"Returns earned (shortened period): ₹{returns_earned_short:,.0f}")
+    st.write(f"Future Value if invested annually for shortened period: {_fmt_rupee(fv_invest_short)}")
+    st.write(f"Total invested (shortened period): {_fmt_rupee(total_invested_short)}")
+    st.write(f"Returns earned (shortened period): {_fmt_rupee(returns_earned_short)}")
 
     net_benefit_short = returns_earned_short - interest_saved
     if net_benefit_short > 0:
-        st.success(f"Net benefit (Investing for shortened period - Interest Saved): ₹{net_benefit_short:,.0f} → Investing while loan lasts (shortened) yields more.")
+        st.success(f"Net benefit (Investing for shortened period - Interest Saved): {_fmt_rupee(net_benefit_short)} → Investing while loan lasts (shortened) yields more.")
     elif net_benefit_short < 0:
-        st.error(f"Net benefit (Investing for shortened period - Interest Saved): ₹{net_benefit_short:,.0f} → Paying extra yields more interest-savings.")
+        st.error(f"Net benefit (Investing for shortened period - Interest Saved): {_fmt_rupee(net_benefit_short)} → Paying extra yields more interest-savings.")
     else:
-        st.info(f"Net benefit: ₹{net_benefit_short:,.0f} → Both options roughly equal for shortened horizon.")
+        st.info(f"Net benefit: {_fmt_rupee(net_benefit_short)} → Both options roughly equal for shortened horizon.")
 
     # Enhanced bar chart: 3 bars (Interest saved, Returns original horizon, Returns shortened horizon)
     labels3 = ["Interest Saved (₹)", "Returns (orig horizon)", "Returns (short horizon)"]
     values3 = [interest_saved, returns_earned, returns_earned_short]
 
-    fig4, ax4 = plt.subplots(figsize=(9, 4))
-    bars3 = ax4.bar(labels3, values3)
-    ax4.set_ylabel("Amount (₹)")
-    ax4.set_title("Interest Saved vs Returns (original vs shortened horizon)")
-    ax4.grid(axis="y", linestyle="--", alpha=0.4)
-
-    for bar in bars3:
-        h = bar.get_height()
-        ax4.annotate(f"₹{h:,.0f}",
-                     xy=(bar.get_x() + bar.get_width() / 2, h),
-                     xytext=(0, 6),
-                     textcoords="offset points",
-                     ha='center', va='bottom')
-
-    ax4.axhline(0, color='black', linewidth=0.8)
-    st.pyplot(fig4)
+    fig4 = go.Figure(go.Bar(x=labels3, y=values3, texttemplate="₹%{y:,.0f}", textposition="outside"))
+    fig4.update_layout(title="Interest Saved vs Returns (original vs shortened horizon)", yaxis_title="Amount (₹)", height=400)
+    fig4.update_yaxes(zeroline=True, zerolinecolor="black", zerolinewidth=0.8)
+    st.plotly_chart(fig4)
 
 else:
     st.info("Click the button above to compare investing only for the shortened loan period (optional).")
 
 st.markdown("---")
 st.subheader("📄 Amortization Table (With Extra Payments)")
-st.dataframe(df_extra)
+
+import polars as pl  # deferred: only the table needs it
+# Only the first two years are sent to the browser unless the full schedule is requested
+# (an st.expander would still serialize every row on each rerun)
+show_all = st.checkbox("Show full schedule")
+rows = slice(None) if show_all else slice(24)
+
+# Whole rupees for display
+st.dataframe(pl.DataFrame({
+    "Month": months_e[rows],
+    "Principal": prin_e[rows].round().astype(np.int64),
+    "Interest": int_e[rows].round().astype(np.int64),
+    "Balance": bal_e[rows].round().astype(np.int64),
+}))
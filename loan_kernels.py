@@ -0,0 +1,44 @@
+import numpy as np
+from numba import njit
+
+# ----------------------------
+# Compiled Amortization Kernel
+# ----------------------------
+
+@njit(cache=True)
+def amort_core(P, r, n, extra_annual):
+    # Month-by-month recurrence for the extra-payment case (balance[m] depends on balance[m-1]).
+    # Runs all n months; the caller truncates at payoff, where the balance first drops to zero.
+    EMI = P * r * (1 + r)**n / ((1 + r)**n - 1)
+
+    months_out = np.empty(n, dtype=np.int64)
+    principal_out = np.empty(n, dtype=np.float64)
+    interest_out = np.empty(n, dtype=np.float64)
+    balance_out = np.empty(n, dtype=np.float64)
+
+    balance = P
+    month_in_year = 0
+
+    for i in range(n):
+        interest = balance * r
+        principal = EMI - interest
+
+        # Apply extra payment once per year (at year-end)
+        month_in_year += 1
+        if month_in_year == 12:
+            principal += extra_annual
+            month_in_year = 0
+
+        balance -= principal
+
+        months_out[i] = i + 1
+        principal_out[i] = principal
+        interest_out[i] = interest
+        balance_out[i] = balance
+
+    return months_out, principal_out, interest_out, balance_out
+
+
+# Compile (or load from cache) once per process. This lives outside app.py because Streamlit
+# re-executes the app script on every rerun, which would rebuild the dispatcher each time.
+amort_core(100_000.0, 0.01, 12, 1_000.0)